@@ -1,6 +1,6 @@
 """
 Dynamic Schema Extraction with Structured Outputs
-Using OpenAI's .parse() with dynamically created Pydantic schemas
+Using OpenAI's structured outputs with dynamically created Pydantic schemas
 
 Benefits of this approach:
 1. Type-safe and guaranteed structure (enforced by the API)
@@ -10,17 +10,121 @@ Benefits of this approach:
 5. Reliable results with automatic retries
 """
 
+import asyncio
+import copy
+import functools
+import hashlib
+import json
+import keyword
+import logging
 import re
-from typing import Literal
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterator
+from typing import TYPE_CHECKING, Annotated, Literal, TypedDict, is_typeddict
 
+import msgspec
+import orjson
 from dotenv import load_dotenv
-from openai import OpenAI
 from pydantic import BaseModel, Field, create_model
 
+# openai and tiktoken are slow to import; they are loaded on first use
+if TYPE_CHECKING:
+    import tiktoken
+    from openai import AsyncOpenAI, OpenAI
+    from openai.types.chat import ChatCompletion
+
 # Load environment variables
 load_dotenv()
 
-client = OpenAI()
+logger = logging.getLogger(__name__)
+
+# Connection pool settings for the OpenAI clients. With HTTP/2, concurrent
+# extraction requests share a few connections instead of opening new ones
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 32
+HTTP_MAX_CONNECTIONS = 64
+HTTP_TIMEOUT = 60.0
+
+
+@functools.cache
+def get_client() -> "OpenAI":
+    """
+    Shared OpenAI client, created on first use.
+    """
+
+    import httpx
+    from openai import DefaultHttpxClient, OpenAI
+
+    return OpenAI(
+        http_client=DefaultHttpxClient(
+            http2=True,
+            limits=httpx.Limits(
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                max_connections=HTTP_MAX_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(HTTP_TIMEOUT),
+        )
+    )
+
+
+def create_async_client() -> "AsyncOpenAI":
+    """
+    New AsyncOpenAI client with its own HTTP/2 connection pool.
+    Use it as `async with create_async_client() as client:` so the pool is
+    closed on the event loop that opened it; every request made inside the
+    block shares its connections.
+    """
+
+    import httpx
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+    return AsyncOpenAI(
+        http_client=DefaultAsyncHttpxClient(
+            http2=True,
+            limits=httpx.Limits(
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                max_connections=HTTP_MAX_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(HTTP_TIMEOUT),
+        )
+    )
+
+
+@functools.cache
+def get_encoding() -> "tiktoken.Encoding":
+    """
+    Tokenizer for gpt-4.1, loaded once on first use.
+    """
+
+    import tiktoken
+
+    return tiktoken.encoding_for_model("gpt-4.1")
+
+
+# Upper bound on extraction requests in flight at once (keeps us under rate limits)
+MAX_CONCURRENT_REQUESTS = 8
+
+# Documents shorter than this (ignoring whitespace) are not sent to the API
+MIN_DOCUMENT_CHARS = 20
+
+# With split_fields, schemas wider than this are extracted in field groups
+WIDE_SCHEMA_THRESHOLD = 6
+FIELD_GROUP_SIZE = 4
+
+# How many distinct dynamic models (and their JSON schemas) to keep cached
+MODEL_CACHE_SIZE = 256
+
+# Seconds between status checks while waiting for a Batch API job
+BATCH_POLL_INTERVAL = 30.0
+
+# Tokens held back for the model's answer when packing documents into one prompt
+RESPONSE_TOKEN_BUFFER = 2000
+
+# Instructions for prompts that pack several delimited documents together
+PACKED_DOCUMENTS_PROMPT = (
+    "The user message contains several documents, each starting with a "
+    "'===DOC <id>===' line. Extract one item per document, in the same order."
+)
 
 # ============================================================================
 # STEP 1: Fixed schema for parsing user's extraction requirements
@@ -56,7 +160,26 @@ def parse_user_requirements(user_description: str) -> ExtractionRequirements:
     Using structured outputs ensures the response matches our schema.
     """
 
-    response = client.beta.chat.completions.parse(
+    response = get_client().beta.chat.completions.parse(
+        model="gpt-4.1",
+        messages=[
+            {"role": "user", "content": user_description},
+        ],
+        response_format=ExtractionRequirements,
+    )
+
+    return response.choices[0].message.parsed
+
+
+async def parse_user_requirements_async(
+    client: "AsyncOpenAI", user_description: str
+) -> ExtractionRequirements:
+    """
+    Async version of parse_user_requirements(), so the async workflow doesn't
+    block its event loop while the requirements are parsed.
+    """
+
+    response = await client.beta.chat.completions.parse(
         model="gpt-4.1",
         messages=[
             {"role": "user", "content": user_description},
@@ -67,10 +190,115 @@ def parse_user_requirements(user_description: str) -> ExtractionRequirements:
     return response.choices[0].message.parsed
 
 
+# Parsed requirements per user description (keyed by digest), most recent last
+_requirements_cache: OrderedDict[str, ExtractionRequirements] = OrderedDict()
+
+
+def _requirements_key(user_description: str) -> str:
+    """
+    Cache key for a user description.
+    """
+
+    return hashlib.blake2b(user_description.encode("utf-8")).hexdigest()
+
+
+def _cached_requirements(key: str) -> ExtractionRequirements | None:
+    """
+    Cached requirements for key (marked most recently used), or None.
+    """
+
+    if key in _requirements_cache:
+        _requirements_cache.move_to_end(key)
+        return _requirements_cache[key]
+
+    return None
+
+
+def _cache_requirements(key: str, requirements: ExtractionRequirements) -> None:
+    """
+    Store requirements, evicting the least recently used beyond MODEL_CACHE_SIZE.
+    """
+
+    _requirements_cache[key] = requirements
+    if len(_requirements_cache) > MODEL_CACHE_SIZE:
+        _requirements_cache.popitem(last=False)
+
+
+def get_user_requirements(user_description: str) -> ExtractionRequirements:
+    """
+    Cached parse_user_requirements().
+    A repeated description skips the parsing call entirely, so extraction
+    can start right away with the schema built for it last time.
+    """
+
+    key = _requirements_key(user_description)
+
+    requirements = _cached_requirements(key)
+    if requirements is None:
+        requirements = parse_user_requirements(user_description)
+        _cache_requirements(key, requirements)
+
+    return requirements
+
+
+async def get_user_requirements_async(
+    client: "AsyncOpenAI", user_description: str
+) -> ExtractionRequirements:
+    """
+    Cached parse_user_requirements_async(); shares its cache with
+    get_user_requirements().
+    """
+
+    key = _requirements_key(user_description)
+
+    requirements = _cached_requirements(key)
+    if requirements is None:
+        requirements = await parse_user_requirements_async(client, user_description)
+        _cache_requirements(key, requirements)
+
+    return requirements
+
+
 # ============================================================================
 # STEP 3: Create dynamic Pydantic model from field specs
 # ============================================================================
 
+# Map string type names to actual Python types
+TYPE_MAPPING = {
+    "str": str,
+    "int": int,
+    "float": float,
+    "bool": bool,
+    "list[str]": list[str],
+}
+
+# Same mapping for optional (nullable) fields, so the union is only built once
+OPTIONAL_TYPE_MAPPING = {
+    name: python_type | None for name, python_type in TYPE_MAPPING.items()
+}
+
+# Map string type names to JSON schema types
+JSON_SCHEMA_TYPES = {
+    "str": {"type": "string"},
+    "int": {"type": "integer"},
+    "float": {"type": "number"},
+    "bool": {"type": "boolean"},
+    "list[str]": {"type": "array", "items": {"type": "string"}},
+}
+
+# Extraction schemas can be Pydantic models or (cheaper to build) msgspec
+# Structs or TypedDicts; TypedDict results are returned as plain dicts
+SchemaBackend = Literal["pydantic", "msgspec", "typeddict"]
+ExtractionType = type[BaseModel] | type[msgspec.Struct] | type[dict]
+Extraction = BaseModel | msgspec.Struct | dict
+
+# Workflow results are dicts, or serialized JSON bytes for writing out directly
+OutputFormat = Literal["dict", "json"]
+
+# Characters OpenAI doesn't allow in schema names, and runs of underscores
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_-]")
+_REPEATED_UNDERSCORES = re.compile(r"_+")
+
 
 def sanitize_model_name(name: str) -> str:
     """
@@ -78,83 +306,836 @@ def sanitize_model_name(name: str) -> str:
     Only alphanumeric, underscores, and hyphens are allowed.
     """
     # Replace spaces and other characters with underscores
-    sanitized = re.sub(r"[^a-zA-Z0-9_-]", "_", name)
+    sanitized = _INVALID_NAME_CHARS.sub("_", name)
     # Remove consecutive underscores
-    sanitized = re.sub(r"_+", "_", sanitized)
+    sanitized = _REPEATED_UNDERSCORES.sub("_", sanitized)
     # Remove leading/trailing underscores
     sanitized = sanitized.strip("_")
     return sanitized
 
 
+# (field_name, field_type, required, description) per field; hashable, so the
+# _build_* functions can cache on it
+FieldSpecTuple = tuple[str, str, bool, str]
+
+
+def _field_specs(requirements: ExtractionRequirements) -> tuple[FieldSpecTuple, ...]:
+    """
+    Hashable field specifications shared by every schema backend.
+    """
+
+    return tuple(
+        (f.field_name, f.field_type, f.required, f.description)
+        for f in requirements.fields
+    )
+
+
+def _model_name(use_case_name: str) -> str:
+    """
+    Class name for an extraction type, sanitized for OpenAI compatibility.
+    """
+
+    return sanitize_model_name(use_case_name) + "_Extraction"
+
+
 def create_extraction_model(requirements: ExtractionRequirements) -> type[BaseModel]:
     """
     Create a Pydantic model dynamically from field specifications.
     This is type-safe and doesn't require code generation or eval().
+
+    Identical requirements return the same (cached) model class.
     """
 
-    # Map string type names to actual Python types
-    type_mapping = {
-        "str": str,
-        "int": int,
-        "float": float,
-        "bool": bool,
-        "list[str]": list[str],
-    }
+    return _build_extraction_model(
+        requirements.use_case_name, _field_specs(requirements)
+    )
 
-    # Build field definitions for create_model()
-    field_definitions = {}
 
-    for field_spec in requirements.fields:
-        python_type = type_mapping[field_spec.field_type]
+@functools.lru_cache(maxsize=MODEL_CACHE_SIZE)
+def _build_extraction_model(
+    use_case_name: str, field_specs: tuple[FieldSpecTuple, ...]
+) -> type[BaseModel]:
+    """
+    Build the model for create_extraction_model().
+    Takes hashable arguments so each distinct schema is only built once.
+    """
 
-        if field_spec.required:
-            # Required field
-            field_definitions[field_spec.field_name] = (
-                python_type,
-                Field(description=field_spec.description),
-            )
-        else:
-            # Optional field
-            field_definitions[field_spec.field_name] = (
-                python_type | None,
-                Field(default=None, description=field_spec.description),
+    # Build field definitions for create_model():
+    # required fields have no default, optional ones are nullable with None
+    field_definitions = {
+        field_name: (
+            (TYPE_MAPPING[field_type], Field(description=description))
+            if required
+            else (
+                OPTIONAL_TYPE_MAPPING[field_type],
+                Field(default=None, description=description),
             )
+        )
+        for field_name, field_type, required, description in field_specs
+    }
 
-    # Sanitize the model name for OpenAI compatibility
-    model_name = sanitize_model_name(requirements.use_case_name) + "_Extraction"
+    model_name = _model_name(use_case_name)
 
     # Create the model dynamically using Pydantic's built-in method
     DynamicModel = create_model(
         model_name,
-        __doc__=f"Extraction model for {requirements.use_case_name}",
+        __doc__=f"Extraction model for {use_case_name}",
         **field_definitions,
     )
 
     return DynamicModel
 
 
+def create_extraction_struct(
+    requirements: ExtractionRequirements,
+) -> type[msgspec.Struct]:
+    """
+    Create a msgspec Struct from field specifications.
+    Same schema as create_extraction_model(), but much cheaper to build
+    and to decode responses into.
+    """
+
+    return _build_extraction_struct(
+        requirements.use_case_name, _field_specs(requirements)
+    )
+
+
+@functools.lru_cache(maxsize=MODEL_CACHE_SIZE)
+def _build_extraction_struct(
+    use_case_name: str, field_specs: tuple[FieldSpecTuple, ...]
+) -> type[msgspec.Struct]:
+    """
+    Build the Struct for create_extraction_struct().
+    """
+
+    fields = []
+    # Field names that aren't Python identifiers (e.g. "start date") get a
+    # safe attribute name and keep their original name in the JSON
+    rename = {}
+    names = {field_name for field_name, *_ in field_specs}
+
+    for i, (field_name, field_type, required, description) in enumerate(field_specs):
+        meta = msgspec.Meta(description=description)
+
+        attribute = field_name
+        if not field_name.isidentifier() or keyword.iskeyword(field_name):
+            attribute = f"field_{i}"
+            while attribute in names:
+                attribute += "_"
+            rename[attribute] = field_name
+
+        if required:
+            fields.append((attribute, Annotated[TYPE_MAPPING[field_type], meta]))
+        else:
+            fields.append(
+                (attribute, Annotated[OPTIONAL_TYPE_MAPPING[field_type], meta], None)
+            )
+
+    model_name = _model_name(use_case_name)
+
+    # kw_only lets optional fields come before required ones
+    return msgspec.defstruct(model_name, fields, kw_only=True, rename=rename or None)
+
+
+def create_extraction_typeddict(requirements: ExtractionRequirements) -> type[dict]:
+    """
+    Create a TypedDict from field specifications.
+    Only describes the result type for callers; the JSON schema sent to
+    OpenAI is written out directly, with no model machinery involved.
+    """
+
+    return _build_extraction_typeddict(
+        requirements.use_case_name, _field_specs(requirements)
+    )
+
+
+@functools.lru_cache(maxsize=MODEL_CACHE_SIZE)
+def _build_extraction_typeddict(
+    use_case_name: str, field_specs: tuple[FieldSpecTuple, ...]
+) -> type[dict]:
+    """
+    Build the TypedDict for create_extraction_typeddict().
+    Its JSON schema is attached as __extraction_schema__.
+    """
+
+    annotations = {}
+    properties = {}
+
+    for field_name, field_type, required, description in field_specs:
+        property_schema = dict(JSON_SCHEMA_TYPES[field_type], description=description)
+
+        if required:
+            annotations[field_name] = TYPE_MAPPING[field_type]
+        else:
+            annotations[field_name] = OPTIONAL_TYPE_MAPPING[field_type]
+            property_schema["type"] = [property_schema["type"], "null"]
+
+        properties[field_name] = property_schema
+
+    model_name = _model_name(use_case_name)
+
+    DynamicTypedDict = TypedDict(model_name, annotations, total=False)
+    DynamicTypedDict.__extraction_schema__ = {
+        "type": "object",
+        "description": f"Extraction model for {use_case_name}",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+    return DynamicTypedDict
+
+
+def _is_struct(extraction_model: ExtractionType) -> bool:
+    """
+    Whether an extraction type is a msgspec Struct rather than a Pydantic model.
+    """
+
+    return issubclass(extraction_model, msgspec.Struct)
+
+
+@functools.lru_cache(maxsize=MODEL_CACHE_SIZE)
+def get_json_schema(extraction_model: ExtractionType) -> dict:
+    """
+    Cached JSON schema for an extraction model, Struct or TypedDict.
+    Treat the returned dict as read-only, it is shared between callers.
+    """
+
+    if is_typeddict(extraction_model):
+        return extraction_model.__extraction_schema__
+
+    if _is_struct(extraction_model):
+        schema = msgspec.json.schema(extraction_model)
+        return schema["$defs"][extraction_model.__name__]
+
+    return extraction_model.model_json_schema()
+
+
+@functools.lru_cache(maxsize=MODEL_CACHE_SIZE)
+def build_response_format(extraction_model: ExtractionType) -> dict:
+    """
+    Build the raw json_schema response_format for an extraction model.
+    Sent as-is on every extraction request, instead of letting .parse()
+    rebuild it from the model each time.
+
+    The schema name is a hash of the schema itself, so identical schemas
+    share OpenAI's compiled-schema cache even when they were created for
+    differently worded use cases (or in another process). The trade-off is
+    an opaque name in API logs; the model class keeps the readable name.
+    """
+
+    schema = copy.deepcopy(get_json_schema(extraction_model))
+
+    # Drop the use case name/description so only the fields determine the hash
+    schema.pop("title", None)
+    schema.pop("description", None)
+
+    # Strict mode requires every property to be listed as required
+    # (optional fields are nullable instead) and no extra properties
+    schema["required"] = list(schema["properties"])
+    schema["additionalProperties"] = False
+    for property_schema in schema["properties"].values():
+        property_schema.pop("default", None)
+
+    canonical = json.dumps(schema, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.blake2b(canonical.encode("utf-8"), digest_size=8).hexdigest()
+
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": f"Extraction_{digest}",
+            "schema": schema,
+            "strict": True,
+        },
+    }
+
+
+def build_partial_response_formats(
+    response_format: dict, group_size: int = FIELD_GROUP_SIZE
+) -> tuple[dict, ...]:
+    """
+    Split a response_format (see build_response_format()) into payloads
+    covering at most group_size fields each, for extracting wide schemas in
+    parallel.
+    """
+
+    json_schema = response_format["json_schema"]
+    properties = list(json_schema["schema"]["properties"].items())
+
+    partial_formats = []
+
+    for part, start in enumerate(range(0, len(properties), group_size), 1):
+        group = dict(properties[start : start + group_size])
+        schema = {**json_schema["schema"], "properties": group, "required": list(group)}
+        partial_formats.append(
+            {
+                "type": "json_schema",
+                "json_schema": {
+                    **json_schema,
+                    "name": f"{json_schema['name']}_Part{part}",
+                    "schema": schema,
+                },
+            }
+        )
+
+    return tuple(partial_formats)
+
+
+def parse_extraction(
+    content: str | bytes, extraction_model: ExtractionType
+) -> Extraction:
+    """
+    Decode a structured outputs JSON response into the extraction type.
+
+    Strict structured outputs already guarantee the response matches the
+    schema, so Pydantic models are built with model_construct() instead of
+    being validated a second time on the client.
+    """
+
+    if _is_struct(extraction_model):
+        return _json_decoder(extraction_model).decode(content)
+
+    return build_extraction(orjson.loads(content), extraction_model)
+
+
+def parse_extractions(
+    content: str | bytes, extraction_model: ExtractionType
+) -> list[Extraction]:
+    """
+    Decode a multi-document response (see build_batch_response_format()).
+    """
+
+    if _is_struct(extraction_model):
+        return _json_decoder(dict[str, list[extraction_model]]).decode(content)["items"]
+
+    return [
+        build_extraction(item, extraction_model)
+        for item in orjson.loads(content)["items"]
+    ]
+
+
+@functools.lru_cache(maxsize=MODEL_CACHE_SIZE)
+def _json_decoder(decode_type: type) -> msgspec.json.Decoder:
+    """
+    Reusable msgspec decoder, so Struct responses decode in one typed pass
+    without looking up the type's decoding plan on every call.
+    """
+
+    return msgspec.json.Decoder(decode_type)
+
+
+def build_extraction(data: dict, extraction_model: ExtractionType) -> Extraction:
+    """
+    Build an extraction from already schema-conformant data (no validation).
+    """
+
+    if is_typeddict(extraction_model):
+        return data
+
+    if _is_struct(extraction_model):
+        return msgspec.convert(data, extraction_model)
+
+    return extraction_model.model_construct(**data)
+
+
+def is_trivial_document(document_text: str) -> bool:
+    """
+    Whether a document is too short (see MIN_DOCUMENT_CHARS) to contain
+    anything worth extracting. Such documents are never sent to the API and
+    their result is None.
+    """
+
+    return len(document_text.strip()) < MIN_DOCUMENT_CHARS
+
+
+def extraction_to_dict(extraction: Extraction) -> dict:
+    """
+    Convert an extracted Pydantic model or Struct into a plain dict.
+    """
+
+    if isinstance(extraction, dict):
+        return extraction
+
+    if isinstance(extraction, msgspec.Struct):
+        # Uses the JSON field names, which can differ from attribute names
+        return msgspec.to_builtins(extraction)
+
+    return extraction.model_dump()
+
+
+def extraction_to_json(extraction: Extraction) -> bytes:
+    """
+    Serialize an extraction to JSON bytes without building a dict first.
+    """
+
+    if isinstance(extraction, dict):
+        return orjson.dumps(extraction)
+
+    if isinstance(extraction, msgspec.Struct):
+        return msgspec.json.encode(extraction)
+
+    # pydantic-core serializes straight from the model in Rust
+    return extraction.model_dump_json().encode("utf-8")
+
+
+def convert_extraction(
+    extraction: Extraction | None, output_format: OutputFormat = "dict"
+) -> dict | bytes | None:
+    """
+    Convert an extraction into the workflow's requested output format.
+    Skipped or failed documents (None) stay None.
+    """
+
+    if extraction is None:
+        return None
+
+    if output_format == "json":
+        return extraction_to_json(extraction)
+
+    return extraction_to_dict(extraction)
+
+
 # ============================================================================
 # STEP 4: Extract data using the dynamic schema with structured outputs
 # ============================================================================
 
 
+def get_response_content(response: "ChatCompletion") -> str:
+    """
+    JSON content of a structured outputs response.
+    Raises, as .parse() does, when the answer was cut off or filtered, or
+    when the model refused, instead of failing later on incomplete JSON.
+    """
+
+    from openai import ContentFilterFinishReasonError, LengthFinishReasonError
+
+    choice = response.choices[0]
+
+    if choice.finish_reason == "length":
+        raise LengthFinishReasonError(completion=response)
+    if choice.finish_reason == "content_filter":
+        raise ContentFilterFinishReasonError()
+    if choice.message.refusal:
+        raise RuntimeError(f"Model refused the extraction: {choice.message.refusal}")
+
+    return choice.message.content
+
+
 def extract_from_document(
-    document_text: str, extraction_model: type[BaseModel]
-) -> BaseModel:
+    document_text: str,
+    extraction_model: ExtractionType,
+    response_format: dict | None = None,
+) -> Extraction | None:
     """
-    Extract structured data from document using .parse().
+    Extract structured data from document using structured outputs.
     The schema is enforced by OpenAI's structured outputs API.
+
+    Pass the same response_format (from build_response_format()) for every
+    document: OpenAI compiles each schema on first use, and an identical
+    name and schema lets later requests reuse that work.
+
+    Documents shorter than MIN_DOCUMENT_CHARS skip the API call and return
+    None (see is_trivial_document()).
     """
 
-    response = client.beta.chat.completions.parse(
+    if is_trivial_document(document_text):
+        return None
+
+    if response_format is None:
+        response_format = build_response_format(extraction_model)
+
+    response = get_client().chat.completions.create(
         model="gpt-4.1",
         messages=[
             {"role": "user", "content": document_text},
         ],
-        response_format=extraction_model,
+        response_format=response_format,
     )
 
-    return response.choices[0].message.parsed
+    return parse_extraction(get_response_content(response), extraction_model)
+
+
+async def _request_extraction_async(
+    client: "AsyncOpenAI",
+    semaphore: asyncio.Semaphore,
+    document_text: str,
+    response_format: dict,
+) -> str:
+    """
+    Send one structured outputs request and return the raw JSON content.
+    The semaphore is held per request, so it bounds requests in flight even
+    when one document is split into several requests.
+    """
+
+    async with semaphore:
+        response = await client.chat.completions.create(
+            model="gpt-4.1",
+            messages=[
+                {"role": "user", "content": document_text},
+            ],
+            response_format=response_format,
+        )
+
+    return get_response_content(response)
+
+
+async def extract_from_document_async(
+    client: "AsyncOpenAI",
+    semaphore: asyncio.Semaphore,
+    document_text: str,
+    extraction_model: ExtractionType,
+    response_format: dict | None = None,
+) -> Extraction | None:
+    """
+    Async version of extract_from_document().
+    Lets many documents be extracted concurrently on one event loop, sharing
+    client (see create_async_client()) and at most as many requests in flight
+    as semaphore allows.
+    """
+
+    if is_trivial_document(document_text):
+        return None
+
+    if response_format is None:
+        response_format = build_response_format(extraction_model)
+
+    content = await _request_extraction_async(
+        client, semaphore, document_text, response_format
+    )
+
+    return parse_extraction(content, extraction_model)
+
+
+async def extract_fields_in_groups_async(
+    client: "AsyncOpenAI",
+    semaphore: asyncio.Semaphore,
+    document_text: str,
+    extraction_model: ExtractionType,
+    partial_formats: tuple[dict, ...],
+) -> Extraction | None:
+    """
+    Extract a wide schema as several smaller schemas in parallel, then merge.
+
+    Hierarchical decomposition as in Hydantic: each request only has to
+    fill a few independent fields, which is faster for wide schemas. The
+    document is sent once per group, so input tokens grow accordingly.
+    Build partial_formats once with build_partial_response_formats().
+    """
+
+    if is_trivial_document(document_text):
+        return None
+
+    contents = await asyncio.gather(
+        *(
+            _request_extraction_async(client, semaphore, document_text, partial_format)
+            for partial_format in partial_formats
+        )
+    )
+
+    merged = {}
+    for content in contents:
+        merged.update(orjson.loads(content))
+
+    return build_extraction(merged, extraction_model)
+
+
+async def iter_extractions(
+    client: "AsyncOpenAI",
+    documents: list[str],
+    extraction_model: ExtractionType,
+    max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+    response_format: dict | None = None,
+    split_fields: bool = False,
+) -> AsyncIterator[tuple[int, Extraction | None]]:
+    """
+    Extract from all documents concurrently, at most max_concurrency at a time.
+    Yields (document index, extraction) pairs as soon as each one completes;
+    the extraction is None for documents skipped by is_trivial_document().
+
+    With split_fields, schemas with more than WIDE_SCHEMA_THRESHOLD fields
+    are extracted in parallel groups (see extract_fields_in_groups_async()),
+    split from response_format. max_concurrency limits individual requests,
+    so a split document counts once per group.
+    """
+
+    if response_format is None:
+        response_format = build_response_format(extraction_model)
+
+    field_count = len(response_format["json_schema"]["schema"]["properties"])
+    if split_fields and field_count > WIDE_SCHEMA_THRESHOLD:
+        partial_formats = build_partial_response_formats(response_format)
+    else:
+        partial_formats = None
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def extract_one(
+        index: int, document_text: str
+    ) -> tuple[int, Extraction | None]:
+        print(f"  Processing document {index + 1}/{len(documents)}...")
+        if partial_formats:
+            return index, await extract_fields_in_groups_async(
+                client, semaphore, document_text, extraction_model, partial_formats
+            )
+        return index, await extract_from_document_async(
+            client, semaphore, document_text, extraction_model, response_format
+        )
+
+    # Only unfinished tasks are kept, so each result can be freed once the
+    # consumer is done with it instead of living until the whole run ends
+    pending = {
+        asyncio.create_task(extract_one(i, doc)) for i, doc in enumerate(documents)
+    }
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                yield task.result()
+    finally:
+        # Don't leave requests running if the consumer stops early
+        for task in pending:
+            task.cancel()
+
+
+def build_batch_requests(
+    documents: list[str], extraction_model: ExtractionType
+) -> bytes:
+    """
+    Serialize one chat completion request per document into Batch API JSONL.
+    The custom_id carries the document index so results can be reordered.
+    Trivially short documents (see is_trivial_document()) are left out.
+    """
+
+    response_format = build_response_format(extraction_model)
+
+    lines = [
+        json.dumps(
+            {
+                "custom_id": f"doc-{i}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": "gpt-4.1",
+                    "messages": [{"role": "user", "content": doc}],
+                    "response_format": response_format,
+                },
+            }
+        )
+        for i, doc in enumerate(documents)
+        if not is_trivial_document(doc)
+    ]
+
+    return "\n".join(lines).encode("utf-8")
+
+
+def _batch_record_error(record: dict) -> str | None:
+    """
+    Why a Batch API output or error file line has no usable extraction, if so.
+    """
+
+    if record.get("error"):
+        return record["error"].get("message") or str(record["error"])
+
+    response = record["response"]
+    if response["status_code"] != 200:
+        error = response["body"].get("error") or {}
+        return error.get("message") or f"HTTP {response['status_code']}"
+
+    choice = response["body"]["choices"][0]
+    if choice.get("finish_reason") in ("length", "content_filter"):
+        return f"finish_reason={choice['finish_reason']}"
+    if choice["message"].get("refusal"):
+        return f"refused: {choice['message']['refusal']}"
+
+    return None
+
+
+def extract_from_documents_batch(
+    documents: list[str],
+    extraction_model: ExtractionType,
+    poll_interval: float = BATCH_POLL_INTERVAL,
+) -> list[Extraction | None]:
+    """
+    Extract from all documents with a single OpenAI Batch API job.
+    Half the cost of regular requests, but results can take up to 24 hours.
+
+    Documents whose request failed are None in the returned list; each
+    failure is logged as a warning with its custom_id and error. Expired or
+    cancelled batches keep the requests that finished before they stopped.
+    Trivially short documents are not submitted and are None as well.
+    """
+
+    results: list[Extraction | None] = [None] * len(documents)
+
+    skipped = {i for i, doc in enumerate(documents) if is_trivial_document(doc)}
+    if len(skipped) == len(documents):
+        return results
+
+    client = get_client()
+
+    batch_file = client.files.create(
+        file=(
+            "extraction_batch.jsonl",
+            build_batch_requests(documents, extraction_model),
+        ),
+        purpose="batch",
+    )
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    request_count = len(documents) - len(skipped)
+    print(f"  Submitted batch {batch.id} with {request_count} requests")
+
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+        print(f"  Batch status: {batch.status}")
+
+    # Expired and cancelled batches still return the requests that finished
+    if batch.status == "failed" or not (batch.output_file_id or batch.error_file_id):
+        raise RuntimeError(f"Batch {batch.id} ended with status '{batch.status}'")
+
+    errors: dict[str, str] = {}
+
+    # Successful lines are in the output file, failed requests in the error file
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for line in client.files.content(file_id).text.splitlines():
+            record = json.loads(line)
+            error = _batch_record_error(record)
+            if error:
+                errors[record["custom_id"]] = error
+                continue
+            index = int(record["custom_id"].removeprefix("doc-"))
+            content = record["response"]["body"]["choices"][0]["message"]["content"]
+            results[index] = parse_extraction(content, extraction_model)
+
+    if batch.status == "completed":
+        missing = "no result returned"
+    else:
+        missing = f"not finished before the batch was {batch.status}"
+    for i, result in enumerate(results):
+        if result is None and i not in skipped:
+            errors.setdefault(f"doc-{i}", missing)
+
+    if errors:
+        print(f"  {len(errors)} of {request_count} requests failed")
+        for custom_id, error in errors.items():
+            logger.warning("Batch %s: %s failed: %s", batch.id, custom_id, error)
+
+    return results
+
+
+def pack_documents(
+    documents: list[str], token_budget: int, encoding: "tiktoken.Encoding"
+) -> list[list[int]]:
+    """
+    Greedily group document indices so each group's prompt fits token_budget.
+    A document larger than the budget on its own still gets its own group.
+    Trivially short documents (see is_trivial_document()) are left out.
+    """
+
+    groups: list[list[int]] = []
+    current: list[int] = []
+    current_tokens = 0
+
+    for i, doc in enumerate(documents):
+        if is_trivial_document(doc):
+            continue
+        doc_tokens = len(encoding.encode(f"\n===DOC {i}===\n{doc}"))
+        if current and current_tokens + doc_tokens > token_budget:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += doc_tokens
+
+    if current:
+        groups.append(current)
+
+    return groups
+
+
+@functools.lru_cache(maxsize=MODEL_CACHE_SIZE)
+def build_batch_response_format(extraction_model: ExtractionType) -> dict:
+    """
+    Wrap an extraction model's schema in a list schema for multi-document
+    prompts: {"items": [<one extraction per document>]}.
+    """
+
+    json_schema = build_response_format(extraction_model)["json_schema"]
+
+    schema = {
+        "type": "object",
+        "properties": {
+            "items": {
+                "type": "array",
+                "description": "One extracted item per document, in document order",
+                "items": json_schema["schema"],
+            }
+        },
+        "required": ["items"],
+        "additionalProperties": False,
+    }
+
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            **json_schema,
+            "name": f"{json_schema['name']}_Batch",
+            "schema": schema,
+        },
+    }
+
+
+def batch_extract(
+    documents: list[str],
+    extraction_model: ExtractionType,
+    context_limit: int = 8000,
+) -> list[Extraction | None]:
+    """
+    Extract from several short documents per API call.
+    Documents are packed into prompts of at most context_limit tokens and
+    parsed into a list of extraction_model items, one per document.
+    Trivially short documents are not sent and are None.
+    """
+
+    encoding = get_encoding()
+    token_budget = (
+        context_limit
+        - len(encoding.encode(PACKED_DOCUMENTS_PROMPT))
+        - RESPONSE_TOKEN_BUFFER
+    )
+
+    response_format = build_batch_response_format(extraction_model)
+
+    results: list[Extraction | None] = [None] * len(documents)
+
+    for group in pack_documents(documents, token_budget, encoding):
+        prompt = "".join(f"\n===DOC {i}===\n{documents[i]}" for i in group)
+        response = get_client().chat.completions.create(
+            model="gpt-4.1",
+            messages=[
+                {"role": "system", "content": PACKED_DOCUMENTS_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            response_format=response_format,
+        )
+        items = parse_extractions(get_response_content(response), extraction_model)
+
+        if len(items) == len(group):
+            for i, item in zip(group, items):
+                results[i] = item
+        else:
+            # Can't tell which item belongs to which document; redo them one by one
+            for i in group:
+                results[i] = extract_from_document(documents[i], extraction_model)
+
+    return results
 
 
 # ============================================================================
@@ -162,46 +1143,311 @@ def extract_from_document(
 # ============================================================================
 
 
-def dynamic_extraction_workflow(
-    user_description: str, documents: list[str]
-) -> list[dict]:
+def prepare_extraction_model(
+    user_description: str, schema_backend: SchemaBackend = "pydantic"
+) -> ExtractionType:
+    """
+    Steps 1-2 of the workflow: parse the description and build the schema.
+    """
+
+    print("Step 1: Parsing user requirements...")
+    requirements = get_user_requirements(user_description)
+
+    return build_extraction_type(requirements, schema_backend)
+
+
+async def prepare_extraction_model_async(
+    client: "AsyncOpenAI",
+    user_description: str,
+    schema_backend: SchemaBackend = "pydantic",
+) -> ExtractionType:
+    """
+    Async version of prepare_extraction_model().
+    """
+
+    print("Step 1: Parsing user requirements...")
+    requirements = await get_user_requirements_async(client, user_description)
+
+    return build_extraction_type(requirements, schema_backend)
+
+
+def build_extraction_type(
+    requirements: ExtractionRequirements, schema_backend: SchemaBackend = "pydantic"
+) -> ExtractionType:
+    """
+    Step 2 of the workflow: build the schema for parsed requirements.
+    """
+
+    print(f"✓ Identified {len(requirements.fields)} fields to extract")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("fields=%s", [f.field_name for f in requirements.fields])
+
+    if schema_backend == "msgspec":
+        print("\nStep 2: Creating dynamic msgspec schema...")
+        ExtractionModel = create_extraction_struct(requirements)
+    elif schema_backend == "typeddict":
+        print("\nStep 2: Creating dynamic TypedDict schema...")
+        ExtractionModel = create_extraction_typeddict(requirements)
+    else:
+        print("\nStep 2: Creating dynamic Pydantic schema...")
+        ExtractionModel = create_extraction_model(requirements)
+    print(f"✓ Created schema: {ExtractionModel.__name__}")
+    # Only materialize the JSON schema for logging when debug output is on
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("schema=%s", get_json_schema(ExtractionModel))
+
+    return ExtractionModel
+
+
+async def iter_dynamic_extraction_async(
+    user_description: str,
+    documents: list[str],
+    max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+    schema_backend: SchemaBackend = "pydantic",
+    output_format: OutputFormat = "dict",
+    split_fields: bool = False,
+) -> AsyncIterator[tuple[int, dict | bytes | None]]:
+    """
+    Streaming version of dynamic_extraction_workflow_async().
+    Yields (document index, extracted data) pairs in completion order, so
+    results can be processed while other documents are still in flight.
+    """
+
+    async with create_async_client() as client:
+        ExtractionModel = await prepare_extraction_model_async(
+            client, user_description, schema_backend
+        )
+        # Built once and reused verbatim so OpenAI's schema cache hits after call #1
+        response_format = build_response_format(ExtractionModel)
+
+        print("\nStep 3: Extracting from documents...")
+        async for index, extraction in iter_extractions(
+            client,
+            documents,
+            ExtractionModel,
+            max_concurrency,
+            response_format,
+            split_fields,
+        ):
+            yield index, convert_extraction(extraction, output_format)
+
+    print(f"✓ Extracted data from {len(documents)} documents")
+
+
+async def dynamic_extraction_workflow_async(
+    user_description: str,
+    documents: list[str],
+    max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+    schema_backend: SchemaBackend = "pydantic",
+    output_format: OutputFormat = "dict",
+    split_fields: bool = False,
+) -> list[dict | bytes | None]:
     """
     Complete workflow from natural language description to structured extraction.
 
     Process:
     1. Parse user requirements into field specifications
-    2. Create dynamic Pydantic schema from specifications
-    3. Extract data using structured outputs (guaranteed format)
+    2. Create a dynamic schema from specifications
+    3. Extract data using structured outputs (guaranteed format),
+       running up to max_concurrency requests in parallel
 
     Advantages:
     - Reliable: API enforces schema compliance
     - Efficient: Minimal API calls needed
     - Safe: No code execution or eval()
-    - Type-safe: Full Pydantic validation
+    - Type-safe: Results match the schema (enforced by the API, not re-validated)
+
+    schema_backend="msgspec" or "typeddict" builds the schema as a msgspec
+    Struct or a TypedDict instead, which are faster to create and decode into.
+    output_format="json" returns each result as serialized JSON bytes.
+    split_fields=True extracts wide schemas in parallel field groups.
+    Documents too short to extract from (see is_trivial_document()) are
+    skipped without an API call and their result is None.
     """
 
-    print("Step 1: Parsing user requirements...")
-    requirements = parse_user_requirements(user_description)
-    print(f"✓ Identified {len(requirements.fields)} fields to extract")
-    print(f"  Fields: {[f.field_name for f in requirements.fields]}")
+    results: list[dict | bytes | None] = [None] * len(documents)
+    async for index, result in iter_dynamic_extraction_async(
+        user_description,
+        documents,
+        max_concurrency,
+        schema_backend,
+        output_format,
+        split_fields,
+    ):
+        results[index] = result
 
-    print("\nStep 2: Creating dynamic Pydantic schema...")
-    ExtractionModel = create_extraction_model(requirements)
-    print(f"✓ Created schema: {ExtractionModel.__name__}")
-    print(f"  Schema: {ExtractionModel.model_json_schema()}")
+    return results
 
-    print("\nStep 3: Extracting from documents...")
-    results = []
-    for i, doc in enumerate(documents):
-        print(f"  Processing document {i + 1}/{len(documents)}...")
-        extracted = extract_from_document(doc, ExtractionModel)
-        results.append(extracted.model_dump())
 
-    print(f"✓ Extracted data from {len(documents)} documents")
+def iter_dynamic_extraction(
+    user_description: str,
+    documents: list[str],
+    max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+    schema_backend: SchemaBackend = "pydantic",
+    output_format: OutputFormat = "dict",
+    split_fields: bool = False,
+) -> Iterator[dict | bytes | None]:
+    """
+    Synchronous streaming version of the workflow.
+    Yields extracted data in document order, each result as soon as it and
+    all documents before it are done. Only out-of-order results are buffered.
+    """
+
+    stream = iter_dynamic_extraction_async(
+        user_description,
+        documents,
+        max_concurrency,
+        schema_backend,
+        output_format,
+        split_fields,
+    )
+
+    async def next_result() -> tuple[int, dict | bytes | None] | None:
+        return await anext(stream, None)
+
+    pending: dict[int, dict | bytes | None] = {}
+    next_index = 0
+
+    with asyncio.Runner() as runner:
+        while (completed := runner.run(next_result())) is not None:
+            index, result = completed
+            pending[index] = result
+            while next_index in pending:
+                yield pending.pop(next_index)
+                next_index += 1
+
+
+async def extract_to_jsonl_async(
+    user_description: str,
+    documents: list[str],
+    path: str,
+    max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+    schema_backend: SchemaBackend = "pydantic",
+    split_fields: bool = False,
+) -> int:
+    """
+    Run the workflow and append each result to a JSONL file as it completes.
+
+    Lines are written in completion order as
+    {"index": <document index>, "extraction": {...}}, with a null extraction
+    for skipped documents. File writes are async
+    too, so slow disks don't hold up requests still in flight.
+    Returns the number of lines written.
+    """
+
+    import aiofiles
+
+    written = 0
+
+    async with aiofiles.open(path, "ab") as f:
+        async for index, result in iter_dynamic_extraction_async(
+            user_description,
+            documents,
+            max_concurrency,
+            schema_backend,
+            "json",
+            split_fields,
+        ):
+            extraction = None if result is None else orjson.Fragment(result)
+            line = orjson.dumps({"index": index, "extraction": extraction})
+            await f.write(line + b"\n")
+            written += 1
+
+    return written
+
+
+def extract_to_jsonl(
+    user_description: str,
+    documents: list[str],
+    path: str,
+    max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+    schema_backend: SchemaBackend = "pydantic",
+    split_fields: bool = False,
+) -> int:
+    """
+    Synchronous entry point for extract_to_jsonl_async().
+    """
+
+    return asyncio.run(
+        extract_to_jsonl_async(
+            user_description,
+            documents,
+            path,
+            max_concurrency,
+            schema_backend,
+            split_fields,
+        )
+    )
+
+
+def dynamic_extraction_workflow_batch(
+    user_description: str,
+    documents: list[str],
+    poll_interval: float = BATCH_POLL_INTERVAL,
+    schema_backend: SchemaBackend = "pydantic",
+    output_format: OutputFormat = "dict",
+) -> list[dict | bytes | None]:
+    """
+    Same workflow as dynamic_extraction_workflow(), but step 3 runs as one
+    OpenAI Batch API job. Use for large, non-latency-sensitive workloads.
+    Documents that failed or were skipped are None in the results.
+    """
+
+    ExtractionModel = prepare_extraction_model(user_description, schema_backend)
+
+    print("\nStep 3: Extracting from documents via Batch API...")
+    extracted = extract_from_documents_batch(documents, ExtractionModel, poll_interval)
+    results = [convert_extraction(item, output_format) for item in extracted]
+
+    succeeded = sum(item is not None for item in extracted)
+    print(f"✓ Extracted data from {succeeded}/{len(documents)} documents")
 
     return results
 
 
+def dynamic_extraction_workflow(
+    user_description: str,
+    documents: list[str],
+    max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+    use_batch: bool = False,
+    schema_backend: SchemaBackend = "pydantic",
+    output_format: OutputFormat = "dict",
+    split_fields: bool = False,
+) -> list[dict | bytes | None]:
+    """
+    Synchronous entry point for dynamic_extraction_workflow_async().
+    From code that already runs an event loop, await the async version instead.
+    Use iter_dynamic_extraction() to process results as they arrive.
+
+    Set use_batch=True to run extraction through the Batch API
+    (~50% cheaper, completes within 24 hours). The Batch API schedules the
+    requests itself, so max_concurrency doesn't apply, and split_fields is
+    not supported. Documents whose batch request failed are None.
+    Documents too short to extract from are None in either mode.
+    """
+
+    if use_batch:
+        if split_fields:
+            raise ValueError("split_fields is not supported with use_batch=True")
+        return dynamic_extraction_workflow_batch(
+            user_description,
+            documents,
+            schema_backend=schema_backend,
+            output_format=output_format,
+        )
+
+    return list(
+        iter_dynamic_extraction(
+            user_description,
+            documents,
+            max_concurrency,
+            schema_backend,
+            output_format,
+            split_fields,
+        )
+    )
+
+
 # ============================================================================
 # EXAMPLE USAGE
 # ============================================================================
@@ -253,5 +1499,8 @@ if __name__ == "__main__":
     print("=" * 80)
     for i, result in enumerate(results, 1):
         print(f"\nDocument {i}:")
+        if result is None:
+            print("  (skipped)")
+            continue
         for key, value in result.items():
             print(f"  {key}: {value}")